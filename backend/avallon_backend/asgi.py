@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "avallon_backend.settings")
 
 application = get_asgi_application()
+
+# Load the embedding model at worker boot rather than on the first request
+from claims.services.embeddings import warmup  # noqa: E402
+
+warmup()
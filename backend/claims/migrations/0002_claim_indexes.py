@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-15 21:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("claims", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="claim",
+            index=models.Index(
+                fields=["-created_at"], name="claims_clai_created_015674_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="claim",
+            index=models.Index(
+                fields=["status", "-created_at"], name="claims_clai_status_eafd60_idx"
+            ),
+        ),
+    ]
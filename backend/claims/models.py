@@ -26,6 +26,10 @@ class Claim(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at"]),
+            models.Index(fields=["status", "-created_at"]),
+        ]
 
 
 class EmailLog(models.Model):
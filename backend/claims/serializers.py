@@ -1,17 +1,32 @@
 from rest_framework import serializers
 from .models import Claim, EmailLog
 
+# Each bulk transcript runs full LLM analysis inside the request
+MAX_BULK_TRANSCRIPTS = 5
+
 
 class ClaimCreateSerializer(serializers.Serializer):
     transcript = serializers.CharField(max_length=10000)
 
 
+class ClaimBulkCreateSerializer(serializers.Serializer):
+    transcripts = serializers.ListField(
+        child=serializers.CharField(max_length=10000), allow_empty=False, max_length=MAX_BULK_TRANSCRIPTS
+    )
+
+
 class ClaimSerializer(serializers.ModelSerializer):
     class Meta:
         model = Claim
         fields = "__all__"
 
 
+class ClaimListSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Claim
+        fields = ["id", "status", "created_at", "classification"]
+
+
 class EmailLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = EmailLog
@@ -1,19 +1,156 @@
+import hashlib
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
 from sentence_transformers import SentenceTransformer
 import numpy as np
 
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Set EMBEDDINGS_BACKEND=onnx to use ONNX Runtime with the int8-quantized
+# export shipped in the model repo. The committed FAISS index holds PyTorch
+# fp32 embeddings, so rebuild it after switching.
+EMBEDDINGS_BACKEND = os.environ.get("EMBEDDINGS_BACKEND", "torch")
+EMBEDDINGS_ONNX_FILE = os.environ.get("EMBEDDINGS_ONNX_FILE", "onnx/model_qint8_avx512.onnx")
+
+# model.encode already length-sorts its inputs, so large batches only pad
+# each batch up to similar-length texts.
+ENCODE_BATCH_SIZE = 1024
+
+# LRU cache of normalized embeddings keyed by a BLAKE2b digest of the text
+EMBED_CACHE_SIZE = 10_000
+
+# Micro-batching for single-text queries: wait up to BATCH_WAIT seconds
+# for up to BATCH_MAX concurrent requests and encode them together.
+BATCH_MAX = 32
+BATCH_WAIT = 0.01
+
 _model = None
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
 
 
 def get_model():
     """Load and cache the embedding model"""
     global _model
     if _model is None:
-        _model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+        if EMBEDDINGS_BACKEND == "onnx":
+            try:
+                _model = SentenceTransformer(
+                    MODEL_NAME,
+                    backend="onnx",
+                    model_kwargs={"file_name": EMBEDDINGS_ONNX_FILE},
+                )
+            except Exception as e:
+                print(f"Failed to load ONNX embedding model, using PyTorch: {e}")
+        if _model is None:
+            _model = SentenceTransformer(MODEL_NAME)
     return _model
 
 
-def embed_texts(texts: list) -> np.ndarray:
-    """Embed a list of texts into vectors"""
+def warmup():
+    """Load the embedding model and run one forward pass
+
+    A failed load is only logged, so the API still starts; similarity search
+    retries the load on first use.
+    """
+    try:
+        get_model().encode(["warmup"], show_progress_bar=False)
+    except Exception as e:
+        print(f"Failed to warm up embedding model: {e}")
+
+
+def _cache_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+def embed_texts(texts: list, show_progress_bar: bool = False) -> np.ndarray:
+    """Embed a list of texts into vectors, reusing cached embeddings"""
+    keys = [_cache_key(t) for t in texts]
+    found = {}
+    with _cache_lock:
+        for key in keys:
+            vec = _cache.get(key)
+            if vec is not None:
+                _cache.move_to_end(key)
+                found[key] = vec
+
+    # Encode each distinct uncached text once
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in found:
+            missing.setdefault(key, text)
+
     model = get_model()
-    vecs = model.encode(texts, normalize_embeddings=True)
-    return np.array(vecs, dtype="float32")
+    if missing:
+        vecs = model.encode(
+            list(missing.values()),
+            batch_size=ENCODE_BATCH_SIZE,
+            normalize_embeddings=True,
+            show_progress_bar=show_progress_bar,
+            convert_to_numpy=True,
+        )
+        if vecs.dtype != np.float32:
+            vecs = vecs.astype("float32", copy=False)
+
+        # Corpus builds (progress bar on) or batches larger than the cache
+        # would only churn it, so they skip caching
+        if not show_progress_bar and len(missing) <= EMBED_CACHE_SIZE:
+            with _cache_lock:
+                for key, vec in zip(missing, vecs):
+                    # Copy cached rows so entries don't pin the whole batch array
+                    _cache[key] = vec.copy()
+                while len(_cache) > EMBED_CACHE_SIZE:
+                    _cache.popitem(last=False)
+
+        # Every text was a distinct miss: the encoder output is already in order
+        if len(missing) == len(texts):
+            return vecs
+        found.update(zip(missing, vecs))
+
+    if not texts:
+        return np.empty((0, model.get_sentence_embedding_dimension()), dtype="float32")
+    return np.stack([found[key] for key in keys])
+
+
+def _batch_worker():
+    """Drain queued texts in batches and resolve their futures"""
+    while True:
+        batch = [_queue.get()]
+        deadline = time.monotonic() + BATCH_WAIT
+        while len(batch) < BATCH_MAX:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(_queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+
+        try:
+            vecs = embed_texts([text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            continue
+        for i, (_, future) in enumerate(batch):
+            future.set_result(vecs[i])
+
+
+def embed_one(text: str) -> np.ndarray:
+    """Embed a single text, coalescing concurrent calls into one encode"""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_batch_worker, name="embedding-batcher", daemon=True)
+            _worker.start()
+    future = Future()
+    _queue.put((text, future))
+    return future.result()
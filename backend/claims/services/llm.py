@@ -1,30 +1,113 @@
 import re
+import torch
 from langchain_huggingface import HuggingFacePipeline
 from langchain.prompts import PromptTemplate
 from transformers import pipeline
 
-try:
-    hf_pipeline = pipeline(
-        "text2text-generation",
-        model="google/flan-t5-base",
-        device=-1,
-        max_length=256,
-    )
-    llm = HuggingFacePipeline(pipeline=hf_pipeline)
-except Exception as e:
-    print(f"Failed to load LLM: {e}")
-    llm = None
+# Prompts per forward pass; six covers every fallback field prompt at once
+BATCH_SIZE = 6
+
+_llm = None
+_llm_failed = False
+
+
+def get_llm():
+    """Load and cache the FLAN-T5 pipeline, or return None if it can't be loaded"""
+    global _llm, _llm_failed
+    if _llm is None and not _llm_failed:
+        if torch.cuda.is_available():
+            device_kwargs = {"device_map": "auto", "torch_dtype": torch.bfloat16}
+        else:
+            device_kwargs = {"device": -1, "torch_dtype": torch.float32}
+        try:
+            hf_pipeline = pipeline(
+                "text2text-generation",
+                model="google/flan-t5-base",
+                max_length=512,
+                truncation=True,
+                num_workers=0,
+                # HuggingFacePipeline only chunks the prompt list; the
+                # transformers pipeline needs its own batch_size to batch them
+                batch_size=BATCH_SIZE,
+                **device_kwargs,
+            )
+            _llm = HuggingFacePipeline(pipeline=hf_pipeline, batch_size=BATCH_SIZE)
+        except Exception as e:
+            print(f"Failed to load LLM: {e}")
+            _llm_failed = True
+    return _llm
+
+
+EXTRACTION_PROMPT = PromptTemplate(
+    input_variables=["text"],
+    template="""Extract the following details from this insurance claim. Answer every line. If a detail is missing, write 'none'.
+NAME: the person's full name
+PHONE: the phone number, e.g. '8-777-123-4567' or '+7-777-123-4567'
+DATE: the date the incident occurred
+LOCATION: the city or location mentioned
+AMOUNT: the claimed amount as a number without currency symbols (KZT or other currencies)
+SUMMARY: what happened, in one clear sentence
+
+Claim: {text}
+
+NAME:"""
+)
+
+# Single-field prompts, used only for labels missing from the combined answer
+FIELD_PROMPTS = {
+    "NAME": PromptTemplate(
+        input_variables=["text"],
+        template="Extract the person's full name from this insurance claim. Only return the name, nothing else. If no name, say 'none'.\n\nClaim: {text}\n\nName:"
+    ),
+    "PHONE": PromptTemplate(
+        input_variables=["text"],
+        template="Extract the phone number from this claim. Look for patterns like '8-777-123-4567' or '+7-777-123-4567'. Only return the phone number, nothing else. If no phone, say 'none'.\n\nClaim: {text}\n\nPhone:"
+    ),
+    "DATE": PromptTemplate(
+        input_variables=["text"],
+        template="What date did the incident occur? Extract only the date from this text. If no date, say 'none'.\n\nText: {text}\n\nDate:"
+    ),
+    "LOCATION": PromptTemplate(
+        input_variables=["text"],
+        template="What city or location is mentioned in this claim? Extract only the location name. If none, say 'none'.\n\nClaim: {text}\n\nLocation:"
+    ),
+    "AMOUNT": PromptTemplate(
+        input_variables=["text"],
+        template="What is the claimed amount in this insurance claim? Look for money amounts in KZT (Kazakhstan Tenge) or other currencies. Only return the number without currency symbols. If no amount, say 'none'.\n\nClaim: {text}\n\nAmount:"
+    ),
+    "SUMMARY": PromptTemplate(
+        input_variables=["text"],
+        template="Summarize what happened in this insurance claim in one clear sentence.\n\nClaim: {text}\n\nSummary:"
+    ),
+}
+
+# Splits "NAME: ... PHONE: ..." answers into label/value pairs
+_FIELD_RE = re.compile(r"\b(NAME|PHONE|DATE|LOCATION|AMOUNT|SUMMARY):\s*")
+_AMOUNT_STRIP = re.compile(r"[^\d,.]")
+
+
+def _parse_fields(raw: str) -> dict:
+    """Parse the combined extraction answer into a {LABEL: value} dict"""
+    # The prompt ends with "NAME:", so the model's answer starts with the name
+    parts = _FIELD_RE.split("NAME: " + raw.strip())
+    fields = {}
+    for label, value in zip(parts[1::2], parts[2::2]):
+        value = value.strip()
+        if value and label not in fields:
+            fields[label] = value
+    return fields
 
 
 def extract_entities(transcript: str) -> dict:
-    """Extract entities using LangChain prompt chaining (Step 1)
+    """Extract entities using a single LangChain extraction prompt (Step 1)
 
-    This demonstrates pure LLM-based extraction using LangChain's prompt chaining.
-    Each field is extracted via a separate prompt to the LLM, showing the power
-    of prompt engineering for information extraction.
+    All six fields are requested in one prompt and parsed from the labelled
+    answer, so the transcript goes through one model forward pass instead of
+    one per field.
     """
-    print("LangChain: Extracting entities via prompt chaining...")
+    print("LangChain: Extracting entities via combined prompt...")
 
+    llm = get_llm()
     if not llm:
         print("LangChain: ERROR - LLM not initialized, falling back to minimal extraction")
         return {
@@ -48,105 +131,68 @@ def extract_entities(transcript: str) -> dict:
         "metadata": {"detected_entities": [], "extraction_method": "langchain_pure_llm"}
     }
 
-    # PROMPT CHAIN STEP 1: Extract claimant name
     try:
-        name_prompt = PromptTemplate(
-            input_variables=["text"],
-            template="Extract the person's full name from this insurance claim. Only return the name, nothing else. If no name, say 'none'.\n\nClaim: {text}\n\nName:"
-        )
-        name_chain = name_prompt | llm
-        name = name_chain.invoke({"text": transcript}).strip()
-        if name and name.lower() != 'none' and len(name) < 50:
-            result["claimant_name"] = name
-            print(f"Name: {name}")
+        raw = llm.invoke(EXTRACTION_PROMPT.format(text=transcript))
+        fields = _parse_fields(raw)
     except Exception as e:
-        print(f"Name extraction error: {type(e).__name__}: {str(e)}")
+        print(f"Extraction error: {type(e).__name__}: {str(e)}")
+        fields = {}
 
-    # PROMPT CHAIN STEP 2: Extract phone number
-    try:
-        phone_prompt = PromptTemplate(
-            input_variables=["text"],
-            template="Extract the phone number from this claim. Look for patterns like '8-777-123-4567' or '+7-777-123-4567'. Only return the phone number, nothing else. If no phone, say 'none'.\n\nClaim: {text}\n\nPhone:"
-        )
-        phone_chain = phone_prompt | llm
-        phone = phone_chain.invoke({"text": transcript}).strip()
-        if phone and phone.lower() != 'none' and len(phone) < 30:
-            # Validate it actually appears in the transcript (prevent hallucination)
-            phone_clean = phone.replace(" ", "").replace("-", "")
-            transcript_clean = transcript.replace(" ", "").replace("-", "")
-            if phone_clean in transcript_clean or phone in transcript:
-                result["contact_phone"] = phone
-                print(f"Phone: {phone}")
-            else:
-                print(f"Phone hallucination prevented: {phone}")
-    except Exception as e:
-        print(f"Phone extraction error: {type(e).__name__}: {str(e)}")
+    # Re-ask any labels the model skipped, batched into one pipeline call
+    missing = [label for label in FIELD_PROMPTS if label not in fields]
+    if missing:
+        try:
+            prompts = [FIELD_PROMPTS[label].format(text=transcript) for label in missing]
+            for label, answer in zip(missing, llm.batch(prompts)):
+                fields[label] = answer.strip()
+            print(f"Re-asked missing fields in one batch: {', '.join(missing)}")
+        except Exception as e:
+            print(f"Fallback extraction error: {type(e).__name__}: {str(e)}")
 
-    # PROMPT CHAIN STEP 3: Extract incident date
-    try:
-        date_prompt = PromptTemplate(
-            input_variables=["text"],
-            template="What date did the incident occur? Extract only the date from this text. If no date, say 'none'.\n\nText: {text}\n\nDate:"
-        )
-        date_chain = date_prompt | llm
-        date = date_chain.invoke({"text": transcript}).strip()
-        if date and date.lower() != 'none' and len(date) < 50:
-            result["incident_datetime"] = date
-            print(f"Date: {date}")
-    except Exception as e:
-        print(f"Date extraction error: {type(e).__name__}: {str(e)}")
+    name = fields.get("NAME")
+    if name and name.lower() != 'none' and len(name) < 50:
+        result["claimant_name"] = name
+        print(f"Name: {name}")
 
-    # PROMPT CHAIN STEP 4: Extract location
-    try:
-        location_prompt = PromptTemplate(
-            input_variables=["text"],
-            template="What city or location is mentioned in this claim? Extract only the location name. If none, say 'none'.\n\nClaim: {text}\n\nLocation:"
-        )
-        location_chain = location_prompt | llm
-        location = location_chain.invoke({"text": transcript}).strip()
-        if location and location.lower() != 'none' and len(location) < 50:
-            result["incident_location"] = location
-            print(f"Location: {location}")
-    except Exception as e:
-        print(f"Location extraction error: {type(e).__name__}: {str(e)}")
+    phone = fields.get("PHONE")
+    if phone and phone.lower() != 'none' and len(phone) < 30:
+        # Validate it actually appears in the transcript (prevent hallucination)
+        phone_clean = phone.replace(" ", "").replace("-", "")
+        transcript_clean = transcript.replace(" ", "").replace("-", "")
+        if phone_clean in transcript_clean or phone in transcript:
+            result["contact_phone"] = phone
+            print(f"Phone: {phone}")
+        else:
+            print(f"Phone hallucination prevented: {phone}")
 
-    # PROMPT CHAIN STEP 5: Extract claimed amount
-    try:
-        amount_prompt = PromptTemplate(
-            input_variables=["text"],
-            template="What is the claimed amount in this insurance claim? Look for money amounts in KZT (Kazakhstan Tenge) or other currencies. Only return the number without currency symbols. If no amount, say 'none'.\n\nClaim: {text}\n\nAmount:"
-        )
-        amount_chain = amount_prompt | llm
-        amount_str = amount_chain.invoke({"text": transcript}).strip()
-        if amount_str and amount_str.lower() != 'none':
-            # Clean and convert to float
-            amount_clean = re.sub(r'[^\d,.]', '', amount_str).replace(',', '')
-            if amount_clean:
-                try:
-                    result["claimed_amount"] = float(amount_clean)
-                    print(f"Amount: {result['claimed_amount']}")
-                except ValueError:
-                    print(f"Amount conversion failed: {amount_str}")
-    except Exception as e:
-        print(f"Amount extraction error: {type(e).__name__}: {str(e)}")
+    date = fields.get("DATE")
+    if date and date.lower() != 'none' and len(date) < 50:
+        result["incident_datetime"] = date
+        print(f"Date: {date}")
 
-    # PROMPT CHAIN STEP 6: Generate description summary
-    try:
-        desc_prompt = PromptTemplate(
-            input_variables=["text"],
-            template="Summarize what happened in this insurance claim in one clear sentence.\n\nClaim: {text}\n\nSummary:"
-        )
-        desc_chain = desc_prompt | llm
-        description = desc_chain.invoke({"text": transcript}).strip()
-        if description and len(description) > 10:
-            result["incident_description"] = description
-            print(f"Description: {description[:60]}...")
-        else:
-            result["incident_description"] = transcript[:200]
-            print("Description fallback to transcript")
-    except Exception as e:
-        print(f"Description error: {type(e).__name__}: {str(e)}")
+    location = fields.get("LOCATION")
+    if location and location.lower() != 'none' and len(location) < 50:
+        result["incident_location"] = location
+        print(f"Location: {location}")
+
+    amount_str = fields.get("AMOUNT")
+    if amount_str and amount_str.lower() != 'none':
+        # Clean and convert to float
+        amount_clean = _AMOUNT_STRIP.sub('', amount_str).replace(',', '')
+        if amount_clean:
+            try:
+                result["claimed_amount"] = float(amount_clean)
+                print(f"Amount: {result['claimed_amount']}")
+            except ValueError:
+                print(f"Amount conversion failed: {amount_str}")
+
+    description = fields.get("SUMMARY")
+    if description and len(description) > 10:
+        result["incident_description"] = description
+        print(f"Description: {description[:60]}...")
+    else:
         result["incident_description"] = transcript[:200]
+        print("Description fallback to transcript")
 
     # Update metadata
     result["metadata"]["detected_entities"] = [
@@ -154,7 +200,7 @@ def extract_entities(transcript: str) -> dict:
         if k not in ["metadata", "incident_description"] and v is not None
     ]
 
-    print(f"LangChain: Extracted {len(result['metadata']['detected_entities'])} fields using 6-step prompt chain")
+    print(f"LangChain: Extracted {len(result['metadata']['detected_entities'])} fields using a single extraction prompt")
     return result
 
 
@@ -183,10 +229,17 @@ def classify_claim(extracted: dict, transcript: str) -> dict:
     if not extracted.get("incident_datetime"):
         flags.append("missing_date")
 
-    try:
-        fraud_prompt = PromptTemplate(
-            input_variables=["text"],
-            template="""Analyze this insurance claim for fraud indicators. Answer with YES or NO for each:
+    # With three flags (or a score under 0.3) the claim is already fraudulent
+    # and further flags can't change the label, so skip the LLM call. Complete
+    # claims still go through it, as it is their only fraud signal.
+    llm_skipped = len(flags) >= 3 or score < 0.3
+
+    llm = None if llm_skipped else get_llm()
+    if llm:
+        try:
+            fraud_prompt = PromptTemplate(
+                input_variables=["text"],
+                template="""Analyze this insurance claim for fraud indicators. Answer with YES or NO for each:
 1. Does the caller not remember important details?
 2. Are documents missing or lost?
 3. Is someone calling on behalf of someone else?
@@ -194,22 +247,23 @@ def classify_claim(extracted: dict, transcript: str) -> dict:
 Claim: {text}
 
 Answer (YES/NO for each line):"""
-        )
-        fraud_chain = fraud_prompt | llm
-        fraud_analysis = fraud_chain.invoke({"text": transcript}).strip().lower()
-
-        if "yes" in fraud_analysis:
-            if "not remember" in fraud_analysis or "don't know" in transcript.lower():
-                flags.append("memory_issues")
-                score -= 0.3
-            if "documents missing" in fraud_analysis or ("lost" in transcript.lower() and "documents" in transcript.lower()):
-                flags.append("missing_documentation")
-                score -= 0.2
-            if "someone else" in fraud_analysis or "friend" in transcript.lower():
-                flags.append("third_party_caller")
-                score -= 0.3
-    except Exception:
-        pass
+            )
+            fraud_chain = fraud_prompt | llm
+            fraud_analysis = fraud_chain.invoke({"text": transcript}).strip().lower()
+            tlow = transcript.lower()
+
+            if "yes" in fraud_analysis:
+                if "not remember" in fraud_analysis or "don't know" in tlow:
+                    flags.append("memory_issues")
+                    score -= 0.3
+                if "documents missing" in fraud_analysis or ("lost" in tlow and "documents" in tlow):
+                    flags.append("missing_documentation")
+                    score -= 0.2
+                if "someone else" in fraud_analysis or "friend" in tlow:
+                    flags.append("third_party_caller")
+                    score -= 0.3
+        except Exception:
+            pass
 
     if score < 0.3 or len(flags) >= 3:
         label = "fraudulent"
@@ -222,9 +276,11 @@ Answer (YES/NO for each line):"""
     if missing_fields:
         rationale += f"Missing: {', '.join(missing_fields)}. "
     if flags:
-        rationale += f"Flags: {', '.join(flags)}."
+        rationale += f"Flags: {', '.join(flags)}. "
     else:
-        rationale += "No red flags detected."
+        rationale += "No red flags detected. "
+    if llm_skipped:
+        rationale += "LLM skipped: deterministic decision."
 
     result = {
         "label": label,
@@ -1,57 +1,223 @@
 import faiss
+import hashlib
 import json
+import math
 import os
-from .embeddings import embed_texts
+import threading
+from contextlib import contextmanager
+import numpy as np
+from .embeddings import embed_texts, embed_one
 
 INDEX_PATH = os.environ.get("FAISS_INDEX_PATH", "faiss.index")
 META_PATH = os.environ.get("FAISS_META_PATH", "faiss_meta.json")
 
+# HNSW graph over int8 scalar-quantized vectors (used below IVF_MIN_SIZE vectors)
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+
+# IVF-PQ parameters for large corpora (PQ needs plenty of training points)
+IVF_MIN_SIZE = 100_000
+PQ_M = 16
+PQ_NBITS = 8
+IVF_NPROBE = 8
+
+# FAISS searches are short; cap its OpenMP pool at half the cores so it
+# contends less with model inference running on the request threads
+faiss.omp_set_num_threads(max(1, (os.cpu_count() or 1) // 2))
+
+class _ReadWriteLock:
+    """Lets searches run concurrently while index changes run alone
+
+    Waiting writers block new readers, so additions aren't starved by a
+    steady stream of searches.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writing or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writing or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+
 _index = None
-_meta = []
+_meta = {}  # FAISS id -> claim metadata
+_writable = False  # False while _index may be a read-only memory map
+_warned_no_id_map = False
+_lock = _ReadWriteLock()
+_load_lock = threading.Lock()
+
+
+def _faiss_id(claim_id) -> int:
+    """Map a claim id to a stable non-negative int64 FAISS id"""
+    if isinstance(claim_id, int):
+        return claim_id
+    digest = hashlib.blake2b(str(claim_id).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") >> 1
 
 
 def load_index():
     """Load FAISS index and metadata from disk"""
-    global _index, _meta
+    global _index, _meta, _writable
+    index = None
+    meta = {}
     if os.path.exists(INDEX_PATH):
-        _index = faiss.read_index(INDEX_PATH)
+        # Memory-map inverted lists instead of copying them onto the heap
+        index = faiss.read_index(INDEX_PATH, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        _tune_index(index)
     if os.path.exists(META_PATH):
         with open(META_PATH) as f:
-            _meta = json.load(f)
-    return _index is not None and len(_meta) == (_index.ntotal if _index else 0)
+            entries = json.load(f)
+        if isinstance(index, faiss.IndexIDMap):
+            meta = {_faiss_id(m["id"]): m for m in entries}
+        else:
+            # Indexes built before the id map use positional ids
+            meta = dict(enumerate(entries))
+    if index is not None and index.ntotal != len(meta):
+        print(f"FAISS index has {index.ntotal} vectors but metadata has {len(meta)} entries; rebuild with scripts/build_faiss.py")
+
+    # Publish index and metadata together so queries never see one without the other
+    with _lock.write():
+        _index = index
+        _meta = meta
+        _writable = False
+    return index is not None and len(meta) == index.ntotal
+
+
+def _ensure_loaded():
+    """Load the index on first use, once even when called from several threads"""
+    if _index is None or not _meta:
+        with _load_lock:
+            if _index is None or not _meta:
+                return load_index()
+    return True
+
+
+def _tune_index(index):
+    """Set search-time parameters for approximate index types"""
+    if isinstance(index, faiss.IndexIDMap):
+        index = faiss.downcast_index(index.index)
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    elif isinstance(index, faiss.IndexIVF):
+        index.nprobe = IVF_NPROBE
 
 
 def build_index(claims_texts: list, meta: list):
     """Build FAISS index from texts and metadata"""
-    global _index, _meta
-    vecs = embed_texts(claims_texts)
-    dim = vecs.shape[1]
-    index = faiss.IndexFlatIP(dim)  # cosine similarity if normalized
-    index.add(vecs)
+    global _index, _meta, _writable
+    vecs = embed_texts(claims_texts, show_progress_bar=True)
+    n, dim = vecs.shape
+    if n >= IVF_MIN_SIZE:
+        quantizer = faiss.IndexFlatIP(dim)  # cosine similarity if normalized
+        nlist = int(4 * math.sqrt(n))
+        base = faiss.IndexIVFPQ(quantizer, dim, nlist, PQ_M, PQ_NBITS, faiss.METRIC_INNER_PRODUCT)
+    else:
+        base = faiss.IndexHNSWSQ(dim, faiss.ScalarQuantizer.QT_8bit, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        base.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    base.train(vecs)
+
+    # Claim ids become FAISS ids, so claims can be added without a rebuild
+    index = faiss.IndexIDMap2(base)
+    ids = np.array([_faiss_id(m["id"]) for m in meta], dtype="int64")
+    index.add_with_ids(vecs, ids)
+    _tune_index(index)
     faiss.write_index(index, INDEX_PATH)
     with open(META_PATH, "w") as f:
         json.dump(meta, f)
-    _index = index
-    _meta = meta
+    with _lock.write():
+        _index = index
+        _meta = dict(zip(ids.tolist(), meta))
+        _writable = True
     return True
 
 
+def add_claim(claim_id, text: str, predicted_label: str = None):
+    """Add one claim to the loaded index in memory
+
+    Live claims have no adjudicated label, so their metadata carries the
+    classifier's prediction as predicted_label and leaves label empty.
+    Additions exist only in the current worker process: each gunicorn worker
+    holds its own corpus, and all of them are lost on restart, since
+    scripts/build_faiss.py rebuilds only from past_claims.json.
+    """
+    global _index, _writable, _warned_no_id_map
+    try:
+        if not _ensure_loaded():
+            return False
+        if not isinstance(_index, faiss.IndexIDMap):
+            if not _warned_no_id_map:
+                print("FAISS index has no id map; rebuild with scripts/build_faiss.py to add claims")
+                _warned_no_id_map = True
+            return False
+
+        fid = _faiss_id(claim_id)
+        if fid in _meta:
+            return False
+        vec = embed_one(text)[None, :]
+        with _lock.write():
+            if not _writable:
+                # Memory-mapped IVF lists are read-only; switch to an in-heap copy
+                _index = faiss.read_index(INDEX_PATH)
+                _tune_index(_index)
+                _writable = True
+            _index.add_with_ids(vec, np.array([fid], dtype="int64"))
+            _meta[fid] = {
+                "id": claim_id,
+                "label": None,
+                "predicted_label": predicted_label,
+                "source": "live",
+                "preview": text[:120],
+            }
+        return True
+    except Exception as e:
+        print(f"Failed to add claim {claim_id} to FAISS index: {type(e).__name__}: {e}")
+        return False
+
+
 def query_similar(text: str, k=3):
     """Query for similar claims"""
-    global _index, _meta
-    if _index is None or not _meta:
-        if not load_index():
-            return []
-    if _index is None:
+    if not _ensure_loaded():
         return []
 
-    q = embed_texts([text])
-    scores, idxs = _index.search(q, min(k, _index.ntotal))
+    q = embed_one(text)[None, :]
     out = []
-    for score, idx in zip(scores[0], idxs[0]):
-        if idx == -1:
-            continue
-        m = _meta[idx].copy()
-        m["similarity"] = float(score)
-        out.append(m)
+    with _lock.read():
+        if _index is None:
+            return []
+        scores, idxs = _index.search(q, min(k, _index.ntotal))
+        for score, idx in zip(scores[0], idxs[0]):
+            m = _meta.get(int(idx))
+            if m is None:
+                continue
+            out.append({**m, "similarity": float(score)})
     return out
@@ -30,6 +30,7 @@ def test_create_claim(monkeypatch):
     monkeypatch.setattr("claims.views.extract_entities", mock_extract)
     monkeypatch.setattr("claims.views.classify_claim", mock_classify)
     monkeypatch.setattr("claims.views.query_similar", mock_similar)
+    monkeypatch.setattr("claims.views.add_claim", lambda *args: True)
 
     # Make API request
     res = client.post(
@@ -47,6 +48,35 @@ def test_create_claim(monkeypatch):
     assert len(data["similar"]) == 1
 
 
+@pytest.mark.django_db
+def test_bulk_create_claims(monkeypatch):
+    """Test creating several claims in one request"""
+    client = APIClient()
+
+    monkeypatch.setattr("claims.views.extract_entities", lambda t: {"claimant_name": t})
+    monkeypatch.setattr(
+        "claims.views.classify_claim",
+        lambda e, t: {"label": "valid", "suggested_next_steps": ["process_claim"]},
+    )
+    monkeypatch.setattr("claims.views.query_similar", lambda t, k=3: [])
+    monkeypatch.setattr("claims.views.add_claim", lambda *args: True)
+
+    res = client.post(
+        "/api/claims/bulk/",
+        {"transcripts": ["First claim", "Second claim"]},
+        format="json",
+    )
+
+    assert res.status_code == 201
+    data = res.json()
+    assert [c["extracted"]["claimant_name"] for c in data] == ["First claim", "Second claim"]
+    assert all(c["status"] == "analysed" for c in data)
+    assert Claim.objects.count() == 2
+
+    res = client.post("/api/claims/bulk/", {"transcripts": ["Claim"] * 6}, format="json")
+    assert res.status_code == 400
+
+
 @pytest.mark.django_db
 def test_claim_action():
     """Test performing actions on a claim"""
@@ -95,3 +125,5 @@ def test_list_claims():
     assert res.status_code == 200
     data = res.json()
     assert len(data) == 2
+    assert data[0]["status"] == "analysed"
+    assert "transcript" not in data[0]
@@ -0,0 +1,95 @@
+import threading
+
+import numpy as np
+import pytest
+
+from claims.services import embeddings
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    embeddings._cache.clear()
+    yield
+    embeddings._cache.clear()
+
+
+class FakeModel:
+    """Stands in for SentenceTransformer, recording each encode call"""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        return np.array([[float(len(t)), 1.0] for t in texts], dtype="float32")
+
+
+def test_embed_one_coalesces_concurrent_calls(monkeypatch):
+    """Test concurrent single-text queries share one encode call"""
+    model = FakeModel()
+    monkeypatch.setattr(embeddings, "get_model", lambda: model)
+    monkeypatch.setattr(embeddings, "BATCH_WAIT", 0.2)
+
+    texts = ["a", "bb", "ccc", "dddd"]
+    results = {}
+
+    def worker(text):
+        results[text] = embeddings.embed_one(text)
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in texts]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(model.calls) == 1
+    for text in texts:
+        assert results[text][0] == len(text)
+
+
+def test_embed_texts_reuses_cached_embeddings(monkeypatch):
+    """Test repeated texts are encoded once and returned in input order"""
+    model = FakeModel()
+    monkeypatch.setattr(embeddings, "get_model", lambda: model)
+
+    first = embeddings.embed_texts(["one", "three", "one"])
+    second = embeddings.embed_texts(["three", "fourth", "one"])
+
+    assert model.calls == [["one", "three"], ["fourth"]]
+    assert first[:, 0].tolist() == [3.0, 5.0, 3.0]
+    assert second[:, 0].tolist() == [5.0, 6.0, 3.0]
+
+
+def test_embed_texts_returns_encoder_output_without_copy(monkeypatch):
+    """Test all-miss calls return the encoder's float32 array as is"""
+    model = FakeModel()
+    encoded = np.ones((2, 2), dtype="float32")
+    monkeypatch.setattr(model, "encode", lambda texts, **kwargs: encoded)
+    monkeypatch.setattr(embeddings, "get_model", lambda: model)
+
+    vecs = embeddings.embed_texts(["a", "b"])
+
+    assert vecs.dtype == np.float32
+    assert vecs.flags["C_CONTIGUOUS"]
+    assert np.shares_memory(vecs, encoded)
+    assert not any(np.shares_memory(v, encoded) for v in embeddings._cache.values())
+
+
+def test_embed_texts_skips_cache_for_corpus_builds(monkeypatch):
+    """Test build-time embedding does not fill the query cache"""
+    model = FakeModel()
+    monkeypatch.setattr(embeddings, "get_model", lambda: model)
+
+    embeddings.embed_texts(["one", "two"], show_progress_bar=True)
+
+    assert len(embeddings._cache) == 0
+
+
+def test_warmup_logs_load_failure(monkeypatch):
+    """Test a failed model load during warmup does not raise"""
+
+    def failing_model():
+        raise OSError("hub offline")
+
+    monkeypatch.setattr(embeddings, "get_model", failing_model)
+    embeddings.warmup()
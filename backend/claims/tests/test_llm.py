@@ -0,0 +1,121 @@
+from types import SimpleNamespace
+
+from claims.services import llm
+
+
+def test_parse_fields():
+    """Test splitting the combined extraction answer into fields"""
+    raw = "Aigerim Zhanatova PHONE: 8-701-234-5678 DATE: September 2, 2024 LOCATION: Almaty AMOUNT: 350,000 SUMMARY: none"
+    fields = llm._parse_fields(raw)
+
+    assert fields["NAME"] == "Aigerim Zhanatova"
+    assert fields["PHONE"] == "8-701-234-5678"
+    assert fields["DATE"] == "September 2, 2024"
+    assert fields["LOCATION"] == "Almaty"
+    assert fields["AMOUNT"] == "350,000"
+    assert fields["SUMMARY"] == "none"
+
+
+def test_extract_entities_single_call(monkeypatch):
+    """Test extraction uses one LLM call and guards against hallucinated phones"""
+    calls = []
+
+    class FakeLLM:
+        def invoke(self, prompt):
+            calls.append(prompt)
+            return (
+                "John Smith\nPHONE: 8-777-000-0000\nDATE: May 1, 2024\n"
+                "LOCATION: Astana\nAMOUNT: 120,000 KZT\n"
+                "SUMMARY: A car hit the claimant's parked vehicle."
+            )
+
+    monkeypatch.setattr(llm, "get_llm", lambda: FakeLLM())
+    result = llm.extract_entities("John Smith, my car was hit in Astana on May 1, 2024.")
+
+    assert len(calls) == 1
+    assert result["claimant_name"] == "John Smith"
+    assert result["contact_phone"] is None
+    assert result["incident_datetime"] == "May 1, 2024"
+    assert result["incident_location"] == "Astana"
+    assert result["claimed_amount"] == 120000.0
+    assert result["incident_description"] == "A car hit the claimant's parked vehicle."
+
+
+def test_extract_entities_batches_missing_fields(monkeypatch):
+    """Test labels skipped by the combined prompt are re-asked in one batch"""
+    batches = []
+
+    class FakeLLM:
+        def invoke(self, prompt):
+            return "Jane Doe SUMMARY: Water pipe burst in the apartment."
+
+        def batch(self, prompts):
+            batches.append(prompts)
+            return ["none", "June 3, 2024", "Almaty", "200000"]
+
+    monkeypatch.setattr(llm, "get_llm", lambda: FakeLLM())
+    result = llm.extract_entities("Jane Doe, a pipe burst in Almaty on June 3, 2024.")
+
+    assert len(batches) == 1
+    assert len(batches[0]) == 4
+    assert result["claimant_name"] == "Jane Doe"
+    assert result["contact_phone"] is None
+    assert result["incident_datetime"] == "June 3, 2024"
+    assert result["incident_location"] == "Almaty"
+    assert result["claimed_amount"] == 200000.0
+
+
+def test_classify_claim_skips_llm_when_decided(monkeypatch):
+    """Test the fraud prompt only runs when it can still change the label"""
+    calls = []
+
+    def fake_llm(prompt):
+        calls.append(prompt)
+        return "no, no, no"
+
+    monkeypatch.setattr(llm, "get_llm", lambda: fake_llm)
+
+    result = llm.classify_claim({}, "I don't know what happened.")
+    assert calls == []
+    assert result["label"] == "fraudulent"
+    assert "LLM skipped" in result["rationale"]
+
+    complete = {"claimant_name": "John Smith", "incident_datetime": "May 1", "claimed_amount": 1000.0}
+    result = llm.classify_claim(complete, "John Smith, accident on May 1, 1000 KZT.")
+    assert len(calls) == 1
+    assert result["label"] == "valid"
+    assert "LLM skipped" not in result["rationale"]
+
+
+def test_fallback_prompts_reach_pipeline_as_one_batch(monkeypatch):
+    """Test re-asked field prompts are run by the transformers pipeline in one batch"""
+    pipelines = []
+
+    class FakePipeline:
+        """Mimics transformers.Pipeline: a factory batch_size becomes the call default"""
+
+        task = "text2text-generation"
+        model = SimpleNamespace(name_or_path="google/flan-t5-base")
+
+        def __init__(self, **kwargs):
+            self._batch_size = kwargs.get("batch_size")
+            self.calls = []
+
+        def __call__(self, inputs, batch_size=None, **kwargs):
+            self.calls.append((len(inputs), batch_size or self._batch_size or 1))
+            return [{"generated_text": "none"} for _ in inputs]
+
+    def fake_factory(task, **kwargs):
+        pipelines.append(FakePipeline(**kwargs))
+        return pipelines[-1]
+
+    monkeypatch.setattr(llm, "pipeline", fake_factory)
+    monkeypatch.setattr(llm, "_llm", None)
+    monkeypatch.setattr(llm, "_llm_failed", False)
+
+    llm.extract_entities("Someone called about a claim.")
+
+    # One combined prompt, then the five skipped fields together
+    n_prompts, batch_size = pipelines[0].calls[-1]
+    assert n_prompts == 5
+    assert batch_size >= n_prompts
@@ -0,0 +1,83 @@
+import threading
+
+import numpy as np
+import pytest
+
+from claims.services import similarity
+
+
+def _unit(seed):
+    vec = np.random.default_rng(seed).standard_normal(384).astype("float32")
+    return vec / np.linalg.norm(vec)
+
+
+@pytest.fixture
+def isolated_index(monkeypatch, tmp_path):
+    """Point the similarity service at a temp index with fake embeddings"""
+    vectors = {f"text {i}": _unit(i) for i in range(301)}
+    monkeypatch.setattr(similarity, "embed_texts", lambda texts, **kwargs: np.stack([vectors[t] for t in texts]))
+    monkeypatch.setattr(similarity, "embed_one", lambda text: vectors[text])
+    monkeypatch.setattr(similarity, "INDEX_PATH", str(tmp_path / "faiss.index"))
+    monkeypatch.setattr(similarity, "META_PATH", str(tmp_path / "faiss_meta.json"))
+    monkeypatch.setattr(similarity, "_index", None)
+    monkeypatch.setattr(similarity, "_meta", {})
+    monkeypatch.setattr(similarity, "_writable", False)
+    monkeypatch.setattr(similarity, "_warned_no_id_map", False)
+
+
+def _build(n):
+    meta = [{"id": f"c{i}", "label": "valid", "preview": f"text {i}"} for i in range(n)]
+    similarity.build_index([f"text {i}" for i in range(n)], meta)
+
+
+def test_build_query_and_add_claim(isolated_index):
+    """Test claims are found by id and new claims are searchable without a rebuild"""
+    _build(4)
+
+    hits = similarity.query_similar("text 2", k=1)
+    assert hits[0]["id"] == "c2"
+    assert hits[0]["similarity"] > 0.9
+
+    assert similarity.add_claim(42, "text 4", "invalid")
+    assert not similarity.add_claim(42, "text 4", "invalid")
+    hits = similarity.query_similar("text 4", k=1)
+    assert hits[0]["id"] == 42
+    assert hits[0]["label"] is None
+    assert hits[0]["predicted_label"] == "invalid"
+
+    # Reloading from disk keeps the original ids
+    similarity._index = None
+    assert similarity.load_index()
+    assert similarity.query_similar("text 1", k=1)[0]["id"] == "c1"
+
+
+def test_add_claim_to_memory_mapped_ivf_index(isolated_index, monkeypatch):
+    """Test claims can be added after loading a read-only memory-mapped IVF index"""
+    monkeypatch.setattr(similarity, "IVF_MIN_SIZE", 100)
+    _build(300)
+    assert similarity.load_index()
+
+    assert similarity.add_claim(7, "text 300", "invalid")
+    assert similarity._index.ntotal == 301
+
+
+def test_searches_share_the_index_lock():
+    """Test readers run together while a writer waits for them"""
+    lock = similarity._ReadWriteLock()
+    second_reader_in = threading.Event()
+    writer_in = threading.Event()
+
+    def reader():
+        with lock.read():
+            second_reader_in.set()
+
+    def writer():
+        with lock.write():
+            writer_in.set()
+
+    with lock.read():
+        threading.Thread(target=reader).start()
+        assert second_reader_in.wait(timeout=1)
+        threading.Thread(target=writer).start()
+        assert not writer_in.wait(timeout=0.1)
+    assert writer_in.wait(timeout=1)
@@ -1,42 +1,97 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import transaction
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from .serializers import ClaimCreateSerializer, ClaimSerializer, EmailLogSerializer
+from .serializers import (
+    ClaimBulkCreateSerializer,
+    ClaimCreateSerializer,
+    ClaimListSerializer,
+    ClaimSerializer,
+    EmailLogSerializer,
+)
 from .models import Claim, EmailLog
 from .services.llm import extract_entities, classify_claim
-from .services.similarity import query_similar
+from .services.similarity import add_claim, query_similar
+
+# Runs the similarity search alongside LLM extraction; both release the GIL
+# inside torch/faiss, so they overlap on separate threads.
+_pool = ThreadPoolExecutor(max_workers=4)
 
 
 class ClaimViewSet(viewsets.ModelViewSet):
     queryset = Claim.objects.all().order_by("-created_at")
     serializer_class = ClaimSerializer
 
-    def create(self, request, *args, **kwargs):
-        """Create a new claim from transcript and analyze it"""
-        ser = ClaimCreateSerializer(data=request.data)
-        ser.is_valid(raise_exception=True)
-        transcript = ser.validated_data["transcript"]
+    def get_queryset(self):
+        # List views skip the transcript and large JSON columns
+        if self.action == "list":
+            return self.queryset.only(*ClaimListSerializer.Meta.fields)
+        return super().get_queryset()
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return ClaimListSerializer
+        return super().get_serializer_class()
 
+    def _analyse(self, transcript, similar_future):
+        """Run extraction and classification, returning Claim field values"""
         # Extract entities from transcript
         extracted = extract_entities(transcript)
 
         # Classify the claim
         classification = classify_claim(extracted, transcript)
 
-        # Find similar past claims
-        similar = query_similar(transcript, k=3)
+        return {
+            "transcript": transcript,
+            "extracted": extracted,
+            "classification": classification,
+            "suggestions": {"next_steps": classification.get("suggested_next_steps", [])},
+            "status": "analysed",
+            "similar": similar_future.result(),
+        }
+
+    def create(self, request, *args, **kwargs):
+        """Create a new claim from transcript and analyze it"""
+        ser = ClaimCreateSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        transcript = ser.validated_data["transcript"]
+
+        # Find similar past claims while entities are being extracted
+        similar_future = _pool.submit(query_similar, transcript, k=3)
 
         # Create claim record
-        claim = Claim.objects.create(
-            transcript=transcript,
-            extracted=extracted,
-            classification=classification,
-            suggestions={"next_steps": classification.get("suggested_next_steps", [])},
-            status="analysed",
-            similar=similar,
-        )
+        claim = Claim.objects.create(**self._analyse(transcript, similar_future))
+
+        # Make the new claim searchable without blocking the response
+        _pool.submit(add_claim, claim.id, transcript, claim.classification.get("label"))
         return Response(ClaimSerializer(claim).data, status=201)
 
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk_create(self, request):
+        """Create and analyze several claims from a list of transcripts
+
+        Transcripts are analysed one after another in this request, each
+        taking several seconds of FLAN-T5 inference on CPU. A full batch of
+        MAX_BULK_TRANSCRIPTS can take close to a minute, so serve this
+        endpoint with a worker timeout of at least 120s.
+        """
+        ser = ClaimBulkCreateSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        transcripts = ser.validated_data["transcripts"]
+
+        # Queue the similarity searches up front; the pool runs up to four at
+        # a time, and concurrent ones can share an embedding batch
+        similar_futures = [_pool.submit(query_similar, t, k=3) for t in transcripts]
+        items = [self._analyse(t, f) for t, f in zip(transcripts, similar_futures)]
+
+        with transaction.atomic():
+            claims = Claim.objects.bulk_create([Claim(**item) for item in items])
+        for claim in claims:
+            _pool.submit(add_claim, claim.id, claim.transcript, claim.classification.get("label"))
+        return Response(ClaimSerializer(claims, many=True).data, status=201)
+
     @action(detail=True, methods=["post"])
     def action(self, request, pk=None):
         """Perform action on a claim (approve/deny/escalate)"""